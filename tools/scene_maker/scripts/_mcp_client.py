@@ -0,0 +1,48 @@
+"""Client-side helpers shared by the Blender MCP scripts in this directory."""
+
+from __future__ import annotations
+
+import json
+import socket
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json is used when orjson is not installed.
+    orjson = None
+
+
+def encode_payload(payload: dict) -> bytes:
+    """Serialize straight to UTF-8 bytes when orjson is available, skipping the str copy."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode("utf-8")
+
+
+def decode_payload(data: bytes | bytearray) -> dict:
+    """Parse a reply with orjson when installed; its decode error subclasses json.JSONDecodeError."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_debug_json(path: Path, payload: object) -> None:
+    """Write an indented JSON debug dump, via orjson when it is installed."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+    else:
+        path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+
+def tune_socket(sock: socket.socket, keepalive_s: int = 30) -> None:
+    """Disable Nagle for the small request/reply messages and enable TCP keepalive.
+
+    Where the platform exposes the knobs, probe after keepalive_s of silence so a Blender that
+    died mid-render surfaces as a socket error instead of waiting out the full read timeout.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for name, value in (("TCP_KEEPIDLE", keepalive_s), ("TCP_KEEPINTVL", keepalive_s), ("TCP_KEEPCNT", 3)):
+        option = getattr(socket, name, None)
+        if option is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, option, value)
@@ -7,40 +7,159 @@ Requires a running Blender instance with the Blender MCP addon listening on loca
 from __future__ import annotations
 
 import argparse
+import base64
 import json
 import socket
+import struct
+import sys
 import textwrap
+import time
+import zlib
+from functools import lru_cache
 from pathlib import Path
 
+from _mcp_client import decode_payload, encode_payload, tune_socket
+
 
 def recv_json(sock: socket.socket, timeout_s: float) -> dict:
+    """Read one JSON reply with recv_into a single buffer that doubles when full.
+
+    Decoding is only attempted when the received bytes end in a closing bracket, so a large
+    reply is not re-parsed after every chunk.
+    """
     sock.settimeout(timeout_s)
-    chunks: list[bytes] = []
+    buf = bytearray(1 << 16)
+    view = memoryview(buf)
+    pos = 0
+    last = 0
     while True:
-        chunk = sock.recv(8192)
-        if not chunk:
+        if pos == len(buf):
+            view.release()
+            buf.extend(bytes(len(buf)))
+            view = memoryview(buf)
+        n = sock.recv_into(view[pos:])
+        if not n:
             break
-        chunks.append(chunk)
+        start, pos = pos, pos + n
+        i = pos - 1
+        while i >= start and buf[i] in b" \t\r\n":
+            i -= 1
+        if i >= start:
+            last = buf[i]
+        if last not in b"}]":
+            continue
         try:
-            return json.loads(b"".join(chunks).decode("utf-8"))
+            return decode_payload(buf[:pos])
         except json.JSONDecodeError:
             continue
 
-    if not chunks:
-        raise RuntimeError("No data received from Blender MCP socket")
-    raise RuntimeError("Received incomplete JSON payload from Blender MCP socket")
+    if not pos:
+        raise ConnectionError("No data received from Blender MCP socket")
+    raise ConnectionError("Received incomplete JSON payload from Blender MCP socket")
+
+
+FRAME_HEADER = struct.Struct(">I")
 
 
-def send_command(host: str, port: int, command_type: str, params: dict, timeout_s: float) -> dict:
-    payload = {"type": command_type, "params": params}
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-        sock.connect((host, port))
-        sock.sendall(json.dumps(payload).encode("utf-8"))
-        response = recv_json(sock, timeout_s)
+def recv_exact(sock: socket.socket, size: int) -> bytearray:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    offset = 0
+    while offset < size:
+        n = sock.recv_into(view[offset:])
+        if not n:
+            raise ConnectionError("Blender MCP socket closed mid-message")
+        offset += n
+    return buf
 
-    if response.get("status") != "success":
-        raise RuntimeError(f"Blender MCP command failed: {response}")
-    return response.get("result", {})
+
+def recv_framed(sock: socket.socket, timeout_s: float) -> dict:
+    """Read one reply sent as a 4-byte big-endian length followed by that many bytes of JSON."""
+    sock.settimeout(timeout_s)
+    (size,) = FRAME_HEADER.unpack(recv_exact(sock, FRAME_HEADER.size))
+    return decode_payload(recv_exact(sock, size))
+
+
+def pack_code(code: str, min_size: int = 4096) -> str:
+    """Wrap large code in a zlib+base64 bootstrap that the stock addon can exec unchanged.
+
+    The bootstrap execs in the addon's namespace, so print output is captured as before.
+    """
+    raw = code.encode("utf-8")
+    if len(raw) < min_size:
+        return code
+    blob = base64.b64encode(zlib.compress(raw, 9)).decode("ascii")
+    packed = f"import base64, zlib\nexec(zlib.decompress(base64.b64decode({blob!r})).decode('utf-8'))\n"
+    return packed if len(packed) < len(code) else code
+
+
+class MCPClient:
+    """One Blender MCP connection reused across commands.
+
+    Socket failures close the connection and are retried with exponential backoff on a fresh
+    one. A failure after the payload went out is only retried for idempotent commands, since
+    re-sending execute_code would start the whole render again.
+
+    With framed=True every message is length-prefixed (FRAME_HEADER) in both directions. The
+    stock addon does not speak this, so it is only for servers patched to match.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        connect_timeout_s: float = 10.0,
+        attempts: int = 3,
+        backoff_s: float = 1.0,
+        framed: bool = False,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.connect_timeout_s = connect_timeout_s
+        self.attempts = attempts
+        self.backoff_s = backoff_s
+        self.framed = framed
+        self.sock: socket.socket | None = None
+
+    def __enter__(self) -> MCPClient:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def call(self, command_type: str, params: dict, timeout_s: float, idempotent: bool = False) -> dict:
+        """Send one command; connect_timeout_s bounds connecting and sending, timeout_s the reply."""
+        payload = encode_payload({"type": command_type, "params": params})
+        if self.framed:
+            payload = FRAME_HEADER.pack(len(payload)) + payload
+        for attempt in range(self.attempts):
+            sent = False
+            try:
+                if self.sock is None:
+                    self.sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout_s)
+                    tune_socket(self.sock)
+                self.sock.settimeout(self.connect_timeout_s)
+                self.sock.sendall(payload)
+                sent = True
+                response = (recv_framed if self.framed else recv_json)(self.sock, timeout_s)
+                break
+            except OSError as err:
+                # A late reply to a timed-out command must not be read as the next one's.
+                self.close()
+                if (sent and not idempotent) or attempt == self.attempts - 1:
+                    raise
+                delay = self.backoff_s * 2**attempt
+                print(f"Blender MCP {command_type} failed ({err}); retrying in {delay:g}s", file=sys.stderr)
+                time.sleep(delay)
+
+        if response.get("status") != "success":
+            raise RuntimeError(f"Blender MCP command failed: {response}")
+        return response.get("result", {})
 
 
 def parse_args() -> argparse.Namespace:
@@ -52,276 +171,66 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--host", default="localhost")
     p.add_argument("--port", type=int, default=9876)
     p.add_argument("--timeout", type=float, default=600.0)
+    p.add_argument("--connect-timeout", type=float, default=10.0)
+    p.add_argument(
+        "--framed",
+        action="store_true",
+        help="Length-prefix messages (4-byte big-endian); needs an addon patched to match",
+    )
     p.add_argument("--mesh", type=Path, default=default_mesh)
     p.add_argument("--out-dir", type=Path, default=default_out)
     p.add_argument("--width", type=int, default=600)
     p.add_argument("--height", type=int, default=600)
     p.add_argument("--samples-master", type=int, default=768)
     p.add_argument("--samples-variants", type=int, default=512)
+    p.add_argument("--device", choices=["CPU", "CUDA", "OPTIX", "HIP", "METAL", "ONEAPI"], default="CPU")
     return p.parse_args()
 
 
+BLENDER_TEMPLATE = Path(__file__).with_name("_buddha_template.py")
+
+
+@lru_cache(maxsize=None)
+def load_blender_template() -> str:
+    return BLENDER_TEMPLATE.read_text(encoding="utf-8")
+
+
 def build_blender_code(args: argparse.Namespace, blend_path: Path, render_dir: Path) -> str:
-    return textwrap.dedent(
-        f"""
+    """Expects args.mesh, blend_path and render_dir to be absolute already (main resolves them)."""
+    params = {
+        "mesh": str(args.mesh),
+        "render_dir": str(render_dir),
+        "blend": str(blend_path),
+        "width": int(args.width),
+        "height": int(args.height),
+        "samples_master": int(args.samples_master),
+        "samples_variants": int(args.samples_variants),
+        "device": args.device,
+    }
+    # Only this header varies between runs; the template text after it is sent unchanged.
+    header = textwrap.dedent(
+        f"""\
         import bpy
         import json
         import math
         import os
+
+        import numpy as np
         from mathutils import Vector
 
-        MESH_PATH = {json.dumps(str(args.mesh.resolve()))}
-        RENDER_DIR = {json.dumps(str(render_dir.resolve()))}
-        BLEND_PATH = {json.dumps(str(blend_path.resolve()))}
-        WIDTH = {int(args.width)}
-        HEIGHT = {int(args.height)}
-        SAMPLES_MASTER = {int(args.samples_master)}
-        SAMPLES_VARIANTS = {int(args.samples_variants)}
-
-        os.makedirs(RENDER_DIR, exist_ok=True)
-        os.makedirs(os.path.dirname(BLEND_PATH), exist_ok=True)
-
-
-        def clear_scene():
-            bpy.ops.object.select_all(action='SELECT')
-            bpy.ops.object.delete(use_global=False)
-            for block in bpy.data.meshes:
-                if block.users == 0:
-                    bpy.data.meshes.remove(block)
-            for block in bpy.data.materials:
-                if block.users == 0:
-                    bpy.data.materials.remove(block)
-
-
-        def look_at(obj, target):
-            direction = Vector(target) - obj.location
-            quat = direction.to_track_quat('-Z', 'Y')
-            obj.rotation_euler = quat.to_euler()
-
-
-        def set_sun_orientation(light_obj, sky_node, azimuth_deg, elevation_deg):
-            az = math.radians(azimuth_deg)
-            el = math.radians(elevation_deg)
-            direction = Vector((
-                math.cos(el) * math.sin(az),
-                math.cos(el) * math.cos(az),
-                math.sin(el),
-            ))
-            light_obj.rotation_euler = direction.to_track_quat('-Z', 'Y').to_euler()
-            sky_node.sun_rotation = az
-            sky_node.sun_elevation = el
-
-
-        clear_scene()
-
-        scene = bpy.context.scene
-        scene.render.engine = 'CYCLES'
-        scene.cycles.device = 'CPU'
-        scene.cycles.use_adaptive_sampling = True
-        scene.cycles.samples = SAMPLES_MASTER
-        scene.cycles.max_bounces = 8
-        scene.cycles.diffuse_bounces = 4
-        scene.cycles.glossy_bounces = 2
-        scene.cycles.transparent_max_bounces = 4
-        scene.cycles.caustics_reflective = False
-        scene.cycles.caustics_refractive = False
-        scene.render.resolution_x = WIDTH
-        scene.render.resolution_y = HEIGHT
-        scene.render.resolution_percentage = 100
-        scene.render.image_settings.file_format = 'PNG'
-        scene.render.image_settings.color_mode = 'RGB'
-        scene.render.image_settings.color_depth = '8'
-        scene.view_settings.view_transform = 'Standard'
-        scene.view_settings.look = 'None'
-        scene.view_settings.exposure = 0.0
-        scene.view_settings.gamma = 1.0
-
-        world = bpy.data.worlds.new('BuddhaWorld')
-        scene.world = world
-        world.use_nodes = True
-        wn = world.node_tree.nodes
-        wl = world.node_tree.links
-        wn.clear()
-
-        world_out = wn.new(type='ShaderNodeOutputWorld')
-        background = wn.new(type='ShaderNodeBackground')
-        sky = wn.new(type='ShaderNodeTexSky')
-        if hasattr(sky, 'bl_rna') and 'sky_type' in sky.bl_rna.properties:
-            enum_items = [it.identifier for it in sky.bl_rna.properties['sky_type'].enum_items]
-            for candidate in ('MULTIPLE_SCATTERING', 'NISHITA', 'PREETHAM', 'HOSEK_WILKIE', 'SINGLE_SCATTERING'):
-                if candidate in enum_items:
-                    sky.sky_type = candidate
-                    break
-        if hasattr(sky, 'altitude'):
-            sky.altitude = 1.0
-        if hasattr(sky, 'air_density'):
-            sky.air_density = 1.2
-        if hasattr(sky, 'dust_density'):
-            sky.dust_density = 1.6
-        if hasattr(sky, 'ozone_density'):
-            sky.ozone_density = 1.0
-        background.inputs['Strength'].default_value = 0.72
-
-        volume = wn.new(type='ShaderNodeVolumePrincipled')
-        volume.inputs['Density'].default_value = 0.002
-        volume.inputs['Anisotropy'].default_value = 0.15
-
-        wl.new(sky.outputs['Color'], background.inputs['Color'])
-        wl.new(background.outputs['Background'], world_out.inputs['Surface'])
-        wl.new(volume.outputs['Volume'], world_out.inputs['Volume'])
-
-        imported_obj = None
-        existing = set(bpy.data.objects)
-        try:
-            bpy.ops.import_mesh.ply(filepath=MESH_PATH)
-        except Exception:
-            bpy.ops.wm.ply_import(filepath=MESH_PATH)
-
-        new_objs = [o for o in bpy.data.objects if o not in existing and o.type == 'MESH']
-        if new_objs:
-            imported_obj = max(new_objs, key=lambda o: len(o.data.vertices))
-        else:
-            mesh_objs = [o for o in bpy.data.objects if o.type == 'MESH']
-            if mesh_objs:
-                imported_obj = max(mesh_objs, key=lambda o: len(o.data.vertices))
-
-        if imported_obj is None:
-            raise RuntimeError(f'Unable to import mesh from {{MESH_PATH}}')
-
-        imported_obj.name = 'Buddha'
-        bpy.ops.object.select_all(action='DESELECT')
-        imported_obj.select_set(True)
-        bpy.context.view_layer.objects.active = imported_obj
-        bpy.ops.object.shade_smooth()
-
-        if all(m.type != 'WEIGHTED_NORMAL' for m in imported_obj.modifiers):
-            mod = imported_obj.modifiers.new(name='WeightedNormal', type='WEIGHTED_NORMAL')
-            mod.keep_sharp = True
-
-        bpy.context.view_layer.update()
-        corners = [imported_obj.matrix_world @ Vector(corner) for corner in imported_obj.bound_box]
-        min_v = Vector((min(v.x for v in corners), min(v.y for v in corners), min(v.z for v in corners)))
-        max_v = Vector((max(v.x for v in corners), max(v.y for v in corners), max(v.z for v in corners)))
-        height = max_v.z - min_v.z
-        if height > 1e-6:
-            target_height = 1.72
-            scale = target_height / height
-            imported_obj.scale = imported_obj.scale * scale
-
-        bpy.context.view_layer.update()
-        corners = [imported_obj.matrix_world @ Vector(corner) for corner in imported_obj.bound_box]
-        min_v = Vector((min(v.x for v in corners), min(v.y for v in corners), min(v.z for v in corners)))
-        max_v = Vector((max(v.x for v in corners), max(v.y for v in corners), max(v.z for v in corners)))
-        center_xy = Vector(((min_v.x + max_v.x) * 0.5, (min_v.y + max_v.y) * 0.5, 0.0))
-        imported_obj.location.x -= center_xy.x
-        imported_obj.location.y -= center_xy.y
-        imported_obj.location.z -= min_v.z
-        imported_obj.rotation_euler[2] = math.radians(14.0)
-
-        buddha_mat = bpy.data.materials.new(name='BuddhaMaterial')
-        buddha_mat.use_nodes = True
-        bsdf = buddha_mat.node_tree.nodes.get('Principled BSDF')
-        bsdf.inputs['Base Color'].default_value = (0.66, 0.64, 0.60, 1.0)
-        bsdf.inputs['Roughness'].default_value = 0.78
-        if imported_obj.data.materials:
-            imported_obj.data.materials[0] = buddha_mat
-        else:
-            imported_obj.data.materials.append(buddha_mat)
-
-        bpy.ops.mesh.primitive_plane_add(size=14.0, location=(0.0, 0.0, 0.0))
-        ground = bpy.context.active_object
-        ground.name = 'Ground'
-
-        ground_mat = bpy.data.materials.new(name='GroundMaterial')
-        ground_mat.use_nodes = True
-        gbsdf = ground_mat.node_tree.nodes.get('Principled BSDF')
-        gbsdf.inputs['Base Color'].default_value = (0.93, 0.92, 0.89, 1.0)
-        gbsdf.inputs['Roughness'].default_value = 0.98
-        if ground.data.materials:
-            ground.data.materials[0] = ground_mat
-        else:
-            ground.data.materials.append(ground_mat)
-
-        sun_data = bpy.data.lights.new(name='SunMainData', type='SUN')
-        sun_data.energy = 4.4
-        sun_data.angle = math.radians(1.1)
-        sun_obj = bpy.data.objects.new(name='SunMain', object_data=sun_data)
-        bpy.context.collection.objects.link(sun_obj)
-
-        fill_data = bpy.data.lights.new(name='FillAreaData', type='AREA')
-        fill_data.energy = 220.0
-        fill_data.shape = 'RECTANGLE'
-        fill_data.size = 3.4
-        fill_data.size_y = 2.2
-        fill_data.color = (1.0, 0.98, 0.93)
-        fill_obj = bpy.data.objects.new(name='FillArea', object_data=fill_data)
-        fill_obj.location = (0.0, -3.3, 2.1)
-        bpy.context.collection.objects.link(fill_obj)
-        look_at(fill_obj, (0.0, 0.0, 0.9))
-
-        rim_data = bpy.data.lights.new(name='RimData', type='SPOT')
-        rim_data.energy = 120.0
-        rim_data.spot_size = math.radians(56.0)
-        rim_data.spot_blend = 0.35
-        rim_data.color = (0.92, 0.95, 1.0)
-        rim_obj = bpy.data.objects.new(name='RimLight', object_data=rim_data)
-        rim_obj.location = (1.9, 2.0, 2.3)
-        bpy.context.collection.objects.link(rim_obj)
-        look_at(rim_obj, (0.0, 0.0, 0.8))
-
-        cam_data = bpy.data.cameras.new(name='MainCameraData')
-        cam_data.lens = 52
-        cam = bpy.data.objects.new(name='MainCamera', object_data=cam_data)
-        cam.location = (0.0, -3.0, 1.28)
-        bpy.context.collection.objects.link(cam)
-        look_at(cam, (0.0, 0.0, 0.92))
-        scene.camera = cam
-
-        def render_variant(file_name, azimuth_deg, elevation_deg, fog_density, samples):
-            set_sun_orientation(sun_obj, sky, azimuth_deg, elevation_deg)
-            volume.inputs['Density'].default_value = fog_density
-            scene.cycles.samples = samples
-            scene.render.filepath = os.path.join(RENDER_DIR, file_name)
-            bpy.ops.render.render(write_still=True)
-
-        render_variant('master_scene_geometry_minimal.png', 160.0, 28.0, 0.0003, SAMPLES_MASTER)
-        render_variant('daylight_reference.png', 118.0, 36.0, 0.0035, SAMPLES_VARIANTS)
-        render_variant('evening_reference.png', 248.0, 12.0, 0.0105, SAMPLES_VARIANTS)
-
-        scene.frame_start = 1
-        scene.frame_end = 120
-        scene.frame_set(1)
-        set_sun_orientation(sun_obj, sky, 110.0, 32.0)
-        volume.inputs['Density'].default_value = 0.0035
-        sun_obj.keyframe_insert(data_path='rotation_euler', frame=1)
-        sky.keyframe_insert(data_path='sun_rotation', frame=1)
-        sky.keyframe_insert(data_path='sun_elevation', frame=1)
-        volume.inputs['Density'].keyframe_insert(data_path='default_value', frame=1)
-
-        scene.frame_set(120)
-        set_sun_orientation(sun_obj, sky, 255.0, 10.0)
-        volume.inputs['Density'].default_value = 0.0105
-        sun_obj.keyframe_insert(data_path='rotation_euler', frame=120)
-        sky.keyframe_insert(data_path='sun_rotation', frame=120)
-        sky.keyframe_insert(data_path='sun_elevation', frame=120)
-        volume.inputs['Density'].keyframe_insert(data_path='default_value', frame=120)
-
-        bpy.ops.wm.save_as_mainfile(filepath=BLEND_PATH)
-
-        summary = {{
-            'blend': BLEND_PATH,
-            'render_dir': RENDER_DIR,
-            'renders': [
-                'master_scene_geometry_minimal.png',
-                'daylight_reference.png',
-                'evening_reference.png',
-            ],
-            'camera': list(cam.location),
-            'mesh': imported_obj.name,
-        }}
-        print(json.dumps(summary))
+        PARAMS = json.loads({json.dumps(json.dumps(params))})
+        MESH_PATH = PARAMS['mesh']
+        RENDER_DIR = PARAMS['render_dir']
+        BLEND_PATH = PARAMS['blend']
+        WIDTH = PARAMS['width']
+        HEIGHT = PARAMS['height']
+        SAMPLES_MASTER = PARAMS['samples_master']
+        SAMPLES_VARIANTS = PARAMS['samples_variants']
+        DEVICE = PARAMS['device']
+
         """
     )
+    return header + load_blender_template()
 
 
 def main() -> None:
@@ -329,29 +238,26 @@ def main() -> None:
 
     if not args.mesh.exists():
         raise SystemExit(f"Mesh file not found: {args.mesh}")
+    args.mesh = args.mesh.resolve()
 
+    # Resolve the root once; its children are plain joins and only need a single-level mkdir.
     out_dir = args.out_dir.resolve()
     render_dir = out_dir / "renders"
     debug_dir = out_dir / "debug"
     blend_path = out_dir / "blender" / "buddha_scene.blend"
-    render_dir.mkdir(parents=True, exist_ok=True)
-    debug_dir.mkdir(parents=True, exist_ok=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for child in (render_dir, debug_dir, blend_path.parent):
+        child.mkdir(exist_ok=True)
 
     code = build_blender_code(args, blend_path=blend_path, render_dir=render_dir)
-    result = send_command(
-        args.host,
-        args.port,
-        "execute_code",
-        {"code": code},
-        timeout_s=args.timeout,
-    )
-
-    scene_info = send_command(args.host, args.port, "get_scene_info", {}, timeout_s=30.0)
+    with MCPClient(args.host, args.port, connect_timeout_s=args.connect_timeout, framed=args.framed) as mcp:
+        result = mcp.call("execute_code", {"code": pack_code(code)}, timeout_s=args.timeout)
+        scene_info = mcp.call("get_scene_info", {}, timeout_s=30.0, idempotent=True)
     (debug_dir / "scene_info.json").write_text(json.dumps(scene_info, indent=2), encoding="utf-8")
     (debug_dir / "execute_result.json").write_text(json.dumps(result, indent=2), encoding="utf-8")
 
     manifest = {
-        "mesh": str(args.mesh.resolve()),
+        "mesh": str(args.mesh),
         "blend": str(blend_path),
         "render_dir": str(render_dir),
         "renders": [
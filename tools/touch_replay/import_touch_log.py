@@ -8,10 +8,11 @@ Usage:
 
 from __future__ import annotations
 
-import csv
 import re
 import sys
+from collections.abc import Iterator
 from pathlib import Path
+from typing import BinaryIO
 
 HEADER = [
     "touch_trace",
@@ -31,7 +32,19 @@ HEADER = [
     "raw7",
 ]
 
-ANSI_RE = re.compile(r"\x1b\[[0-9;?]*[ -/]*[@-~]")
+# The log is scanned as bytes; only the tail after a marker is decoded.
+ANSI_RE = re.compile(rb"\x1b\[[0-9;?]*[ -/]*[@-~]")
+# Either marker; the lookahead captures the rest of the line without consuming it, so a marker
+# that appears later on the same line is still found.
+LINE_RE = re.compile(rb"touch_(trace|event),(?=([^\r\n]*))")
+# ms, count, x0, y0, x1, y1 at the start of a touch_trace tail. Rows that do not match fall back
+# to parse_int, which accepts the same tokens as before and names the offending field. re.ASCII
+# keeps \d/\s on plain byte-range tests; Unicode digits or spaces simply take the fallback.
+TRACE_INTS_RE = re.compile(r"\s*(-?\d+)\s*,(?:\s*-?\d+\s*,){5}", re.ASCII)
+_INT_RE = re.compile(r"-?\d+", re.ASCII)
+TRACE_FIELDS = len(HEADER) - 1
+# Trace rows are formatted as str and encoded/written once per batch of this many rows.
+ROW_BATCH = 4096
 EVENT_KINDS = {
     "down",
     "move",
@@ -54,6 +67,18 @@ def usage() -> str:
     )
 
 
+def iter_log_lines(handle: BinaryIO) -> Iterator[bytes]:
+    """Yield lines split the way text-mode universal newlines would (LF, CRLF and lone CR)."""
+    for raw in handle:
+        if b"\r" not in raw:
+            yield raw
+            continue
+        pieces = raw.replace(b"\r\n", b"\n").split(b"\r")
+        if not pieces[-1]:
+            pieces.pop()
+        yield from pieces
+
+
 def parse_int(token: str, field: str, line_no: int) -> int:
     token = token.strip()
     try:
@@ -62,6 +87,22 @@ def parse_int(token: str, field: str, line_no: int) -> int:
         raise ValueError(f"line {line_no}: invalid {field} '{token}'") from exc
 
 
+def format_row(parts: list[str]) -> str:
+    """Format one CSV row exactly as csv.writer's default dialect would (QUOTE_MINIMAL, CRLF).
+
+    Fields come from a comma split of a single line, so only a double quote can need quoting.
+    """
+    if any('"' in part for part in parts):
+        parts = ['"' + part.replace('"', '""') + '"' if '"' in part else part for part in parts]
+    return ",".join(parts) + "\r\n"
+
+
+def check_int(token: str, field: str, line_no: int) -> None:
+    """Validate an integer field without building the int for the common plain-digits case."""
+    if _INT_RE.fullmatch(token) is None:
+        parse_int(token, field, line_no)
+
+
 def parse_args(argv: list[str]) -> tuple[Path, Path, bool, Path | None]:
     if len(argv) < 3:
         raise ValueError(usage())
@@ -90,78 +131,101 @@ def parse_args(argv: list[str]) -> tuple[Path, Path, bool, Path | None]:
     return input_path, output_path, keep_absolute_time, events_output
 
 
-def main(argv: list[str]) -> int:
-    try:
-        input_path, output_path, keep_absolute_time, events_output = parse_args(argv)
-    except ValueError as err:
-        print(str(err), file=sys.stderr)
-        return 2
-
+def process(
+    input_path: Path, output_path: Path, keep_absolute_time: bool, events_output: Path | None = None
+) -> int:
+    """Convert one serial log; returns the process exit code and reports problems on stderr."""
     if not input_path.exists():
         print(f"input file not found: {input_path}", file=sys.stderr)
         return 2
 
-    rows: list[list[str]] = []
+    n_rows = 0
+    base_ms: int | None = None
     event_kinds: list[str] = []
 
-    with input_path.open("r", encoding="utf-8", errors="replace") as handle:
-        for line_no, line in enumerate(handle, start=1):
-            cleaned = ANSI_RE.sub("", line)
-
-            trace_marker = cleaned.find("touch_trace,")
-            if trace_marker >= 0:
-                candidate = cleaned[trace_marker:].strip()
-                parts = [part.strip() for part in candidate.split(",")]
-                if len(parts) >= len(HEADER):
-                    parts = parts[: len(HEADER)]
-                    if parts[0] == "touch_trace" and parts[1] != "ms":
-                        try:
-                            parse_int(parts[1], "ms", line_no)
-                            parse_int(parts[2], "count", line_no)
-                            for idx, field in enumerate(("x0", "y0", "x1", "y1"), start=3):
-                                parse_int(parts[idx], field, line_no)
-                        except ValueError as err:
-                            print(str(err), file=sys.stderr)
-                            return 2
-                        rows.append(parts)
-
-            event_marker = cleaned.find("touch_event,")
-            if event_marker >= 0:
-                candidate = cleaned[event_marker:].strip()
-                parts = [part.strip() for part in candidate.split(",")]
-                if len(parts) < 3 or parts[0] != "touch_event":
-                    continue
-                if parts[1] == "ms" or parts[2] == "kind":
-                    continue
-
-                try:
-                    parse_int(parts[1], "event_ms", line_no)
-                except ValueError as err:
-                    print(str(err), file=sys.stderr)
-                    return 2
-
-                kind = parts[2].strip().lower()
-                if kind not in EVENT_KINDS:
-                    print(f"line {line_no}: invalid event kind '{parts[2]}'", file=sys.stderr)
-                    return 2
-                event_kinds.append(kind)
-
-    if not rows:
-        print(f"no touch_trace rows found in: {input_path}", file=sys.stderr)
-        return 1
-
-    if not keep_absolute_time:
-        base_ms = int(rows[0][1], 10)
-        for row in rows:
-            row[1] = str(int(row[1], 10) - base_ms)
-
+    # Rows are streamed into a temp file that only replaces output_path once the whole log
+    # parsed cleanly, so a bad line never leaves a truncated trace behind.
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.writer(handle)
-        writer.writerow(HEADER)
-        writer.writerows(rows)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    try:
+        with input_path.open("rb") as handle, tmp_path.open("wb", buffering=1 << 20) as out_handle:
+            batch = [format_row(HEADER)]
+            for line_no, line in enumerate(iter_log_lines(handle), start=1):
+                cleaned = ANSI_RE.sub(b"", line) if b"\x1b" in line else line
+                if b"touch_" not in cleaned:
+                    continue
 
-    print(f"wrote {len(rows)} touch rows -> {output_path}")
+                trace_tail = event_tail = None
+                for match in LINE_RE.finditer(cleaned):
+                    if match.group(1) == b"trace":
+                        if trace_tail is None:
+                            trace_tail = match.group(2).decode("utf-8", errors="replace")
+                    elif event_tail is None:
+                        event_tail = match.group(2).decode("utf-8", errors="replace")
+
+                if trace_tail is not None:
+                    # Split off only the fields we keep; whitespace is the only thing strip() can
+                    # remove, and str.isprintable() is False for every whitespace char but " ".
+                    fields = trace_tail.split(",", TRACE_FIELDS)
+                    if len(fields) >= TRACE_FIELDS:
+                        del fields[TRACE_FIELDS:]
+                        if " " in trace_tail or not trace_tail.isprintable():
+                            fields = [field.strip() for field in fields]
+                        parts = ["touch_trace", *fields]
+                        if parts[1] != "ms":
+                            ints = TRACE_INTS_RE.match(trace_tail)
+                            if ints is not None:
+                                ms = int(ints.group(1), 10)
+                            else:
+                                try:
+                                    ms = parse_int(parts[1], "ms", line_no)
+                                    check_int(parts[2], "count", line_no)
+                                    for idx, field in enumerate(("x0", "y0", "x1", "y1"), start=3):
+                                        check_int(parts[idx], field, line_no)
+                                except ValueError as err:
+                                    print(str(err), file=sys.stderr)
+                                    return 2
+                            if not keep_absolute_time:
+                                if base_ms is None:
+                                    base_ms = ms
+                                parts[1] = str(ms - base_ms)
+                            batch.append(format_row(parts))
+                            n_rows += 1
+                            if len(batch) >= ROW_BATCH:
+                                out_handle.write("".join(batch).encode("utf-8"))
+                                batch.clear()
+
+                if event_tail is not None:
+                    fields = event_tail.split(",", 2)
+                    if len(fields) < 2:
+                        continue
+                    parts = ["touch_event", fields[0].strip(), fields[1].strip()]
+                    if parts[1] == "ms" or parts[2] == "kind":
+                        continue
+
+                    try:
+                        check_int(parts[1], "event_ms", line_no)
+                    except ValueError as err:
+                        print(str(err), file=sys.stderr)
+                        return 2
+
+                    kind = parts[2].strip().lower()
+                    if kind not in EVENT_KINDS:
+                        print(f"line {line_no}: invalid event kind '{parts[2]}'", file=sys.stderr)
+                        return 2
+                    event_kinds.append(kind)
+
+            out_handle.write("".join(batch).encode("utf-8"))
+
+        if not n_rows:
+            print(f"no touch_trace rows found in: {input_path}", file=sys.stderr)
+            return 1
+
+        tmp_path.replace(output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    print(f"wrote {n_rows} touch rows -> {output_path}")
 
     if events_output is not None:
         events_output.parent.mkdir(parents=True, exist_ok=True)
@@ -174,5 +238,14 @@ def main(argv: list[str]) -> int:
     return 0
 
 
+def main(argv: list[str]) -> int:
+    try:
+        input_path, output_path, keep_absolute_time, events_output = parse_args(argv)
+    except ValueError as err:
+        print(str(err), file=sys.stderr)
+        return 2
+    return process(input_path, output_path, keep_absolute_time, events_output)
+
+
 if __name__ == "__main__":
     raise SystemExit(main(sys.argv))